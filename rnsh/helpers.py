@@ -1,5 +1,123 @@
+from __future__ import annotations
 import asyncio
+import collections
 import time
+import RNS
+
+
+class BufPool:
+    """
+    Small pool of reusable ``bytearray`` slabs used when coalescing
+    buffered stream chunks, so a chatty stream recycles a handful of
+    buffers instead of allocating a fresh one per drain.
+    """
+    MAX_POOL_SIZE = 16
+    MAX_RECYCLE_LEN = RNS.RawChannelWriter.MAX_CHUNK_LEN
+
+    _buffers: collections.deque = collections.deque()
+
+    @classmethod
+    def get(cls, size: int) -> bytearray:
+        try:
+            buf = cls._buffers.pop()
+        except IndexError:
+            return bytearray(size)
+        if len(buf) < size:
+            buf.extend(bytes(size - len(buf)))
+        else:
+            del buf[size:]
+        return buf
+
+    @classmethod
+    def put(cls, buf: bytearray):
+        if len(cls._buffers) < cls.MAX_POOL_SIZE and len(buf) <= cls.MAX_RECYCLE_LEN:
+            cls._buffers.append(buf)
+
+
+class ChunkBuffer:
+    """
+    Byte queue holding data as a deque of chunks plus a read offset into
+    the head chunk. Appending and consuming are O(chunk) rather than
+    O(total buffered), and a partial consume just advances the offset,
+    avoiding the copies a ``bytearray`` slice-and-reassign incurs on
+    every drain.
+
+    Coalesced head chunks are assembled in ``bytearray`` slabs rented
+    from ``BufPool`` and recycled once fully consumed. Data passed to
+    ``extend`` is stored by reference and must not be mutated afterward.
+    """
+    def __init__(self):
+        self._chunks = collections.deque()
+        self._len = 0
+        self._off = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def extend(self, data: bytes):
+        if data:
+            self._chunks.append(data)
+            self._len += len(data)
+
+    def peek(self, limit: int) -> bytes | bytearray:
+        """
+        Return up to ``limit`` bytes from the head of the buffer without
+        consuming them, coalescing head chunks into one as needed.
+        """
+        chunks = self._chunks
+        if not chunks:
+            return bytes()
+        off = self._off
+        head = chunks[0]
+        if len(head) - off < limit and len(chunks) > 1:
+            chunks.popleft()
+            if off:
+                part = head[off:]
+                if isinstance(head, bytearray):
+                    BufPool.put(head)
+                head = part
+            parts = [head]
+            total = len(head)
+            need = limit - total
+            while need > 0 and chunks:
+                part = chunks.popleft()
+                parts.append(part)
+                need -= len(part)
+                total += len(part)
+            head = BufPool.get(total)
+            offset = 0
+            for part in parts:
+                head[offset:offset + len(part)] = part
+                offset += len(part)
+                if isinstance(part, bytearray):
+                    BufPool.put(part)
+            chunks.appendleft(head)
+            self._off = off = 0
+        if off == 0 and len(head) <= limit:
+            return head
+        return head[off:off + limit]
+
+    def consume(self, count: int):
+        """
+        Discard ``count`` bytes from the head of the buffer.
+        """
+        chunks = self._chunks
+        off = self._off
+        while count > 0 and chunks:
+            head = chunks[0]
+            avail = len(head) - off
+            if avail > count:
+                off += count
+                self._len -= count
+                count = 0
+            else:
+                chunks.popleft()
+                if isinstance(head, bytearray):
+                    BufPool.put(head)
+                self._len -= avail
+                count -= avail
+                off = 0
+        self._off = off
 
 
 def bitwise_or_if(value: int, condition: bool, orval: int):
@@ -215,7 +215,8 @@ async def _initiate_link(configdir, identitypath=None, verbosity=0, quietness=0,
 
 
 async def _handle_error(errmsg: RNS.MessageBase):
-    if isinstance(errmsg, protocol.ErrorMessage):
+    # exact-type check; protocol message classes are never subclassed
+    if type(errmsg) is protocol.ErrorMessage:
         with contextlib.suppress(Exception):
             if _link and _link.status == RNS.Link.ACTIVE:
                 _link.teardown()
@@ -230,7 +231,9 @@ async def initiate(configdir: str, identitypath: str, verbosity: int, quietness:
     with process.TTYRestorer(sys.stdin.fileno()) as ttyRestorer:
         loop = asyncio.get_running_loop()
         state = InitiatorState.IS_INITIAL
-        data_buffer = bytearray(sys.stdin.buffer.read()) if not os.isatty(sys.stdin.fileno()) else bytearray()
+        data_buffer = helpers.ChunkBuffer()
+        if not os.isatty(sys.stdin.fileno()):
+            data_buffer.extend(sys.stdin.buffer.read())
         line_buffer = bytearray()
 
         await _initiate_link(
@@ -347,7 +350,9 @@ async def initiate(configdir: str, identitypath: str, verbosity: int, quietness:
                     else:
                         line_buffer.extend(data)
                         if line_flush:
-                            data_buffer.extend(line_buffer)
+                            # ChunkBuffer keeps a reference, so snapshot the
+                            # line buffer before it is cleared
+                            data_buffer.extend(bytes(line_buffer))
                             line_buffer.clear()
                             os.write(1, ("\b \b"*blind_write_count).encode("utf-8"))
                             line_flush = False
@@ -396,7 +401,6 @@ async def initiate(configdir: str, identitypath: str, verbosity: int, quietness:
         _finished = asyncio.Event()
         loop.add_signal_handler(signal.SIGINT, functools.partial(_sigint_handler, signal.SIGINT, loop))
         loop.add_signal_handler(signal.SIGTERM, functools.partial(_sigint_handler, signal.SIGTERM, loop))
-        mdu = _link.MDU - 16
         sent_eof = False
         last_winch = time.time()
         sleeper = helpers.SleepRate(0.01)
@@ -407,7 +411,7 @@ async def initiate(configdir: str, identitypath: str, verbosity: int, quietness:
                     message = _pq.get(timeout=sleeper.next_sleep_time() if not processed else 0.0005)
                     await _handle_error(message)
                     processed = True
-                    if isinstance(message, protocol.StreamDataMessage):
+                    if type(message) is protocol.StreamDataMessage:
                         if message.stream_id == protocol.StreamDataMessage.STREAM_ID_STDOUT:
                             if message.data and len(message.data) > 0:
                                 ttyRestorer.raw()
@@ -424,10 +428,10 @@ async def initiate(configdir: str, identitypath: str, verbosity: int, quietness:
                                 sys.stderr.flush()
                             if message.eof:
                                 os.close(2)
-                    elif isinstance(message, protocol.CommandExitedMessage):
+                    elif type(message) is protocol.CommandExitedMessage:
                         log.debug(f"received return code {message.return_code}, exiting")
                         return message.return_code
-                    elif isinstance(message, protocol.ErrorMessage):
+                    elif type(message) is protocol.ErrorMessage:
                         log.error(message.data)
                         if message.fatal:
                             _link.teardown()
@@ -467,9 +471,10 @@ async def initiate(configdir: str, identitypath: str, verbosity: int, quietness:
 
                         return comp_success, processed_length, chunk
 
-                    comp_success, processed_length, chunk = compress_adaptive(data_buffer)
+                    comp_success, processed_length, chunk = compress_adaptive(
+                        data_buffer.peek(RNS.RawChannelWriter.MAX_CHUNK_LEN))
                     stdin = chunk
-                    data_buffer = data_buffer[processed_length:]
+                    data_buffer.consume(processed_length)
                     eof = not sent_eof and stdin_eof and len(stdin) == 0
                     if len(stdin) > 0 or eof:
                         channel.send(protocol.StreamDataMessage(protocol.StreamDataMessage.STREAM_ID_STDIN, stdin, eof, comp_success))
@@ -203,19 +203,14 @@ async def listen(configdir, command, identitypath=None, service_name=None, verbo
         _destination.announce()
 
     last_announce = time.time()
-    sleeper = helpers.SleepRate(0.01)
 
     try:
-        while not await _check_finished():
+        # sessions pump themselves as data arrives; this loop only handles
+        # shutdown and periodic announces
+        while not await _check_finished(0.25):
             if announce_period and 0 < announce_period < time.time() - last_announce:
                 last_announce = time.time()
                 _destination.announce()
-            if len(session.ListenerSession.sessions) > 0:
-                # no sleep if there's work to do
-                if not await session.ListenerSession.pump_all():
-                    await sleeper.sleep_async()
-            else:
-                await asyncio.sleep(0.25)
     finally:
         log.warning("Shutting down")
         await session.ListenerSession.terminate_all("Shutting down")
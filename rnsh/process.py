@@ -527,10 +527,11 @@ class CallbackSubprocess:
         """
         return self._pid is not None and process_exists(self._pid)
 
-    def write(self, data: bytes):
+    def write(self, data: bytes | memoryview):
         """
         Write bytes to the stdin of the child process.
-        :param data: bytes to write
+        :param data: bytes-like object to write; written to the child fd
+                     without an intermediate copy
         """
         os.write(self._child_stdin, data)
 
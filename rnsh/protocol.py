@@ -1,22 +1,10 @@
 from __future__ import annotations
 
-import enum
-import queue
-import threading
-import time
-import typing
-import uuid
-from types import TracebackType
-from typing import Type, Callable, TypeVar, Tuple
 import RNS
 from RNS.vendor import umsgpack
 from RNS.Buffer import StreamDataMessage as RNSStreamDataMessage
-import rnsh.retry
-import abc
-import contextlib
-import struct
+import rnsh
 import logging as __logging
-from abc import ABC, abstractmethod
 
 module_logger = __logging.getLogger(__name__)
 
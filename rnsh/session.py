@@ -1,6 +1,6 @@
 from __future__ import annotations
-import contextlib
-import functools
+import collections
+import struct
 import threading
 import rnsh.exception as exception
 import asyncio
@@ -8,9 +8,8 @@ import rnsh.process as process
 import rnsh.helpers as helpers
 import rnsh.protocol as protocol
 import enum
-from typing import TypeVar, Generic, Callable, List
+from typing import TypeVar, Generic, Callable, Dict
 from abc import abstractmethod, ABC
-from multiprocessing import Manager
 import os
 import bz2
 import RNS
@@ -67,7 +66,7 @@ class LSOutletBase(ABC):
 
 
 class ListenerSession:
-    sessions: List[ListenerSession] = []
+    sessions: Dict[int, ListenerSession] = {}
     allowed_identity_hashes: [any] = []
     allowed_file_identity_hashes: [any] = []
     allow_all: bool = False
@@ -75,6 +74,8 @@ class ListenerSession:
     default_command: [str] = []
     remote_cmd_as_args = False
 
+    PUMP_RETRY_DELAY = 0.01
+
     def __init__(self, outlet: LSOutletBase, channel: RNS.Channel.Channel, loop: asyncio.AbstractEventLoop):
         self._log = module_logger.getChild(self.__class__.__name__)
         self._log.info(f"Session started for {outlet}")
@@ -83,6 +84,8 @@ class ListenerSession:
         self.outlet.set_initiator_identified_callback(self._initiator_identified)
         self.outlet.set_link_closed_callback(self._link_closed)
         self.loop = loop
+        self._loop_thread_id: int | None = None
+        loop.call_soon_threadsafe(self._record_loop_thread)
         self.state: LSState = None
         self.remote_identity = None
         self.term: str | None = None
@@ -95,40 +98,53 @@ class ListenerSession:
         self.cols: int = 0
         self.hpix: int = 0
         self.vpix: int = 0
-        self.stdout_buf = bytearray()
+        self.stdout_buf = helpers.ChunkBuffer()
         self.stdout_eof_sent = False
-        self.stderr_buf = bytearray()
+        self.stderr_buf = helpers.ChunkBuffer()
         self.stderr_eof_sent = False
         self.return_code: int | None = None
         self.return_code_sent = False
+        self._data_ready: asyncio.Event | None = None
+        self._pump_task: asyncio.Task | None = None
+        self._inbound = collections.deque()
+        self._inbound_scheduled = False
+        self._inbound_lock = threading.Lock()
         self.process: process.CallbackSubprocess | None = None
         if self.allow_all:
             self._set_state(LSState.LSSTATE_WAIT_VERS)
         else:
             self._set_state(LSState.LSSTATE_WAIT_IDENT)
-        self.sessions.append(self)
+        self.sessions[id(self.outlet)] = self
         protocol.register_message_types(self.channel)
         self.channel.add_message_handler(self._handle_message)
 
     def _terminated(self, return_code: int):
         self.return_code = return_code
+        self._notify_data_ready()
 
     def _set_state(self, state: LSState, timeout_factor: float = 10.0):
-        timeout = max(self.outlet.rtt * timeout_factor, max(self.outlet.rtt * 2, 10)) if timeout_factor is not None else None
+        rtt = self.outlet.rtt
+        timeout = max(rtt * timeout_factor, max(rtt * 2, 10)) if timeout_factor is not None else None
         self._log.debug(f"Set state: {state.name}, timeout {timeout}")
         orig_state = self.state
         self.state = state
         if timeout_factor is not None:
-            self._call(functools.partial(self._check_protocol_timeout, lambda: self.state == orig_state, state.name), timeout)
+            self._call(self._check_protocol_timeout, timeout, orig_state, state.name)
+
+    def _record_loop_thread(self):
+        self._loop_thread_id = threading.get_ident()
 
-    def _call(self, func: callable, delay: float = 0):
-        def call_inner():
-            # self._log.debug("call_inner")
+    def _call(self, func: callable, delay: float = 0, *args):
+        if threading.get_ident() == self._loop_thread_id:
+            # already on the loop thread, skip the threadsafe self-pipe wakeup
             if delay == 0:
-                func()
+                self.loop.call_soon(func, *args)
             else:
-                self.loop.call_later(delay, func)
-        self.loop.call_soon_threadsafe(call_inner)
+                self.loop.call_later(delay, func, *args)
+        elif delay == 0:
+            self.loop.call_soon_threadsafe(func, *args)
+        else:
+            self.loop.call_soon_threadsafe(self.loop.call_later, delay, func, *args)
 
     def send(self, message: RNS.MessageBase):
         self.channel.send(message)
@@ -140,30 +156,34 @@ class ListenerSession:
         self.terminate(f"Protocol timeout error: {name}")
 
     def terminate(self, error: str = None):
-        with contextlib.suppress(Exception):
+        try:
             self._log.debug("Terminating session" + (f": {error}" if error else ""))
             if error and self.state != LSState.LSSTATE_TEARDOWN:
-                with contextlib.suppress(Exception):
+                try:
                     self.send(protocol.ErrorMessage(error, True))
+                except Exception:
+                    pass
             self.state = LSState.LSSTATE_ERROR
+            self._notify_data_ready()
             self._terminate_process()
             self._call(self._prune, max(self.outlet.rtt * 3, process.CallbackSubprocess.PROCESS_PIPE_TIME+5))
+        except Exception:
+            pass
 
     def _prune(self):
         self.state = LSState.LSSTATE_TEARDOWN
         self._log.debug("Pruning session")
-        with contextlib.suppress(ValueError):
-            self.sessions.remove(self)
-        with contextlib.suppress(Exception):
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            self._pump_task = None
+        self.sessions.pop(id(self.outlet), None)
+        try:
             self.outlet.teardown()
+        except Exception:
+            pass
 
-    def _check_protocol_timeout(self, fail_condition: Callable[[], bool], name: str):
-        timeout = True
-        try:
-            timeout = self.state != LSState.LSSTATE_TEARDOWN and fail_condition()
-        except Exception as ex:
-                self._log.exception("Error in protocol timeout", ex)
-        if timeout:
+    def _check_protocol_timeout(self, expected_state: LSState, name: str):
+        if self.state != LSState.LSSTATE_TEARDOWN and self.state == expected_state:
             self._protocol_timeout_error(name)
 
     def _link_closed(self, outlet: LSOutletBase):
@@ -191,21 +211,31 @@ class ListenerSession:
         self.remote_identity = identity
         self._set_state(LSState.LSSTATE_WAIT_VERS)
 
-    @classmethod
-    async def pump_all(cls) -> True:
-        processed_any = False
-        for session in cls.sessions:
-            processed = session.pump()
-            processed_any = processed_any or processed
-            await asyncio.sleep(0)
-
-
     @classmethod
     async def terminate_all(cls, reason: str):
-        for session in cls.sessions:
+        for session in list(cls.sessions.values()):
             session.terminate(reason)
             await asyncio.sleep(0)
 
+    def _pump_pending(self) -> bool:
+        return self.state == LSState.LSSTATE_RUNNING \
+            and (len(self.stderr_buf) > 0 or len(self.stdout_buf) > 0
+                 or (self.return_code is not None and not self.return_code_sent))
+
+    def _notify_data_ready(self):
+        if self._data_ready is not None:
+            self._call(self._data_ready.set)
+
+    async def _pump_loop(self):
+        while self.state == LSState.LSSTATE_RUNNING:
+            await self._data_ready.wait()
+            self._data_ready.clear()
+            self.pump()
+            if self._pump_pending():
+                # channel window is full; retry once deliveries drain it
+                await asyncio.sleep(self.PUMP_RETRY_DELAY)
+                self._data_ready.set()
+
     def pump(self) -> bool:
         def compress_adaptive(buf: bytes):
             comp_tries = RNS.RawChannelWriter.COMPRESSION_TRIES
@@ -240,51 +270,59 @@ class ListenerSession:
         try:
             if self.state != LSState.LSSTATE_RUNNING:
                 return False
-            elif not self.channel.is_ready_to_send():
-                return False
-            elif len(self.stderr_buf) > 0:
-                comp_success, processed_length, data = compress_adaptive(self.stderr_buf)
-                self.stderr_buf = self.stderr_buf[processed_length:]
-                send_eof = self.process.stderr_eof and len(data) == 0 and not self.stderr_eof_sent
-                self.stderr_eof_sent = self.stderr_eof_sent or send_eof
-                msg = protocol.StreamDataMessage(protocol.StreamDataMessage.STREAM_ID_STDERR,
-                                                 data, send_eof, comp_success)
-                self.send(msg)
-                if send_eof:
-                    self.stderr_eof_sent = True
-                return True
-            elif len(self.stdout_buf) > 0:
-                comp_success, processed_length, data = compress_adaptive(self.stdout_buf)
-                self.stdout_buf = self.stdout_buf[processed_length:]
-                send_eof = self.process.stdout_eof and len(data) == 0 and not self.stdout_eof_sent
-                self.stdout_eof_sent = self.stdout_eof_sent or send_eof
-                msg = protocol.StreamDataMessage(protocol.StreamDataMessage.STREAM_ID_STDOUT,
-                                                 data, send_eof, comp_success)
-                self.send(msg)
-                if send_eof:
-                    self.stdout_eof_sent = True
-                return True
-            elif self.return_code is not None and not self.return_code_sent:
-                msg = protocol.CommandExitedMessage(self.return_code)
-                self.send(msg)
-                self.return_code_sent = True
-                self._call(functools.partial(self._check_protocol_timeout,
-                                             lambda: self.state == LSState.LSSTATE_RUNNING, "CommandExitedMessage"),
-                           max(self.outlet.rtt * 5, 10))
-                return False
+            # bind hot attributes to locals for the duration of the pass
+            channel = self.channel
+            stderr_buf = self.stderr_buf
+            stdout_buf = self.stdout_buf
+            stream_data_message = protocol.StreamDataMessage
+            max_chunk_len = RNS.RawChannelWriter.MAX_CHUNK_LEN
+            processed = False
+            # drain as much as the channel window accepts in one pass so a
+            # burst of child output doesn't pay a pump wakeup per message
+            while channel.is_ready_to_send():
+                if len(stderr_buf) > 0:
+                    comp_success, processed_length, data = compress_adaptive(
+                        stderr_buf.peek(max_chunk_len))
+                    stderr_buf.consume(processed_length)
+                    send_eof = self.process.stderr_eof and len(data) == 0 and not self.stderr_eof_sent
+                    self.stderr_eof_sent = self.stderr_eof_sent or send_eof
+                    self.send(stream_data_message(stream_data_message.STREAM_ID_STDERR,
+                                                  data, send_eof, comp_success))
+                    processed = True
+                elif len(stdout_buf) > 0:
+                    comp_success, processed_length, data = compress_adaptive(
+                        stdout_buf.peek(max_chunk_len))
+                    stdout_buf.consume(processed_length)
+                    send_eof = self.process.stdout_eof and len(data) == 0 and not self.stdout_eof_sent
+                    self.stdout_eof_sent = self.stdout_eof_sent or send_eof
+                    self.send(stream_data_message(stream_data_message.STREAM_ID_STDOUT,
+                                                  data, send_eof, comp_success))
+                    processed = True
+                elif self.return_code is not None and not self.return_code_sent:
+                    self.send(protocol.CommandExitedMessage(self.return_code))
+                    self.return_code_sent = True
+                    self._call(self._check_protocol_timeout, max(self.outlet.rtt * 5, 10),
+                               LSState.LSSTATE_RUNNING, "CommandExitedMessage")
+                    break
+                else:
+                    break
+            return processed
         except Exception as ex:
             self._log.exception("Error during pump", ex)
         return False
 
     def _terminate_process(self):
-        with contextlib.suppress(Exception):
+        try:
             if self.process and self.process.running:
                 self.process.terminate()
+        except OSError:
+            pass
 
     def _start_cmd(self, cmdline: [str], pipe_stdin: bool, pipe_stdout: bool, pipe_stderr: bool, tcflags: [any],
                    term: str | None, rows: int, cols: int, hpix: int, vpix: int):
 
-        self.cmdline = self.default_command
+        # copy so extending never mutates the shared class-level default
+        self.cmdline = list(self.default_command)
         if not self.allow_remote_command and cmdline and len(cmdline) > 0:
             self.terminate("Remote command line not allowed by listener")
             return
@@ -303,11 +341,16 @@ class ListenerSession:
 
         def stdout(data: bytes):
             self.stdout_buf.extend(data)
+            self._notify_data_ready()
 
         def stderr(data: bytes):
             self.stderr_buf.extend(data)
+            self._notify_data_ready()
 
         try:
+            # runs on the loop thread; the event must exist before the
+            # process callbacks can fire
+            self._data_ready = asyncio.Event()
             self.process = process.CallbackSubprocess(argv=self.cmdline,
                                                       env={"TERM": self.term or os.environ.get("TERM", None),
                                                             "RNS_REMOTE_IDENTITY": (RNS.prettyhexrep(self.remote_identity.hash)
@@ -321,6 +364,7 @@ class ListenerSession:
                                                       stderr_is_pipe=self.stderr_is_pipe)
             self.process.start()
             self._set_window_size(rows, cols, hpix, vpix)
+            self._pump_task = self.loop.create_task(self._pump_loop())
         except Exception as ex:
             self._log.exception(f"Unable to start process for link {self.outlet}", ex)
             self.terminate("Unable to start process")
@@ -330,72 +374,113 @@ class ListenerSession:
         self.cols = cols
         self.hpix = hpix
         self.vpix = vpix
-        with contextlib.suppress(Exception):
+        try:
+            # process may not exist yet (or its fd may be gone at teardown);
+            # struct.error covers None dimensions from a fully piped initiator
             self.process.set_winsize(rows, cols, hpix, vpix)
+        except (AttributeError, TypeError, OSError, struct.error):
+            pass
 
-    def _received_stdin(self, data: bytes, eof: bool):
+    def _received_stdin(self, data: bytes | memoryview, eof: bool):
+        # data is handed to the PTY write unmodified; no intermediate copy
         if data and len(data) > 0:
             self.process.write(data)
         if eof:
             self.process.close_stdin()
 
+    def _handle_version(self, message: protocol.VersionInfoMessage):
+        self._log.info(f"version {message.sw_version}, protocol {message.protocol_version} on link {self.outlet}")
+        if message.protocol_version != protocol.PROTOCOL_VERSION:
+            self.terminate("Incompatible protocol")
+            return
+        self.send(protocol.VersionInfoMessage())
+        self._set_state(LSState.LSSTATE_WAIT_CMD)
+
+    def _handle_execute(self, message: protocol.ExecuteCommandMesssage):
+        self._log.info(f"Execute command message on link {self.outlet}: {message.cmdline}")
+        self._set_state(LSState.LSSTATE_RUNNING)
+        self._start_cmd(message.cmdline, message.pipe_stdin, message.pipe_stdout, message.pipe_stderr,
+                        message.tcflags, message.term, message.rows, message.cols, message.hpix, message.vpix)
+
+    def _handle_window_size(self, message: protocol.WindowSizeMessage):
+        self._set_window_size(message.rows, message.cols, message.hpix, message.vpix)
+
+    def _handle_stream_data(self, message: protocol.StreamDataMessage):
+        if message.stream_id != protocol.StreamDataMessage.STREAM_ID_STDIN:
+            self._log.error(f"Received stream data for invalid stream {message.stream_id} on link {self.outlet}")
+            return self._protocol_error(self.state.name)
+        self._received_stdin(message.data, message.eof)
+
+    def _handle_noop(self, message: protocol.NoopMessage):
+        # echo noop only on listener--used for keepalive/connectivity check
+        self.send(message)
+
+    # two-level dispatch keyed by state and exact message type; cheaper than
+    # walking an isinstance chain for every inbound packet
+    _DISPATCH = {
+        LSState.LSSTATE_WAIT_VERS: {protocol.VersionInfoMessage: _handle_version},
+        LSState.LSSTATE_WAIT_CMD: {protocol.ExecuteCommandMesssage: _handle_execute},
+        LSState.LSSTATE_RUNNING: {protocol.WindowSizeMessage: _handle_window_size,
+                                  protocol.StreamDataMessage: _handle_stream_data,
+                                  protocol.NoopMessage: _handle_noop},
+    }
+
     def _handle_message(self, message: RNS.MessageBase):
+        # runs on the RNS I/O thread; defer handling to the event loop,
+        # coalescing a burst of messages into a single drain callback
+        with self._inbound_lock:
+            self._inbound.append(message)
+            if self._inbound_scheduled:
+                return
+            self._inbound_scheduled = True
+        self._call(self._drain_inbound)
+
+    def _drain_inbound(self):
+        while True:
+            with self._inbound_lock:
+                if not self._inbound:
+                    self._inbound_scheduled = False
+                    return
+                message = self._inbound.popleft()
+            try:
+                self._dispatch_message(message)
+            except Exception as ex:
+                self._log.exception("Error handling inbound message", ex)
+
+    def _dispatch_message(self, message: RNS.MessageBase):
         if self.state == LSState.LSSTATE_WAIT_IDENT:
             self._protocol_error("Identification required")
             return
-        if self.state == LSState.LSSTATE_WAIT_VERS:
-            if not isinstance(message, protocol.VersionInfoMessage):
-                self._protocol_error(self.state.name)
-                return
-            self._log.info(f"version {message.sw_version}, protocol {message.protocol_version} on link {self.outlet}")
-            if message.protocol_version != protocol.PROTOCOL_VERSION:
-                self.terminate("Incompatible protocol")
-                return
-            self.send(protocol.VersionInfoMessage())
-            self._set_state(LSState.LSSTATE_WAIT_CMD)
-            return
-        elif self.state == LSState.LSSTATE_WAIT_CMD:
-            if not isinstance(message, protocol.ExecuteCommandMesssage):
-                return self._protocol_error(self.state.name)
-            self._log.info(f"Execute command message on link {self.outlet}: {message.cmdline}")
-            self._set_state(LSState.LSSTATE_RUNNING)
-            self._start_cmd(message.cmdline, message.pipe_stdin, message.pipe_stdout, message.pipe_stderr,
-                            message.tcflags, message.term, message.rows, message.cols, message.hpix, message.vpix)
-            return
-        elif self.state == LSState.LSSTATE_RUNNING:
-            if isinstance(message, protocol.WindowSizeMessage):
-                self._set_window_size(message.rows, message.cols, message.hpix, message.vpix)
-            elif isinstance(message, protocol.StreamDataMessage):
-                if message.stream_id != protocol.StreamDataMessage.STREAM_ID_STDIN:
-                    self._log.error(f"Received stream data for invalid stream {message.stream_id} on link {self.outlet}")
-                    return self._protocol_error(self.state.name)
-                self._received_stdin(message.data, message.eof)
-                return
-            elif isinstance(message, protocol.NoopMessage):
-                # echo noop only on listener--used for keepalive/connectivity check
-                self.send(message)
-                return
-        elif self.state in [LSState.LSSTATE_ERROR, LSState.LSSTATE_TEARDOWN]:
+        if self.state in [LSState.LSSTATE_ERROR, LSState.LSSTATE_TEARDOWN]:
             self._log.error(f"Received packet, but in state {self.state.name}")
             return
-        else:
+        handlers = self._DISPATCH.get(self.state)
+        if handlers is None:
             self._protocol_error("unexpected message")
             return
+        handler = handlers.get(type(message))
+        if handler is not None:
+            handler(self, message)
+        elif self.state != LSState.LSSTATE_RUNNING:
+            # in the running state unrecognized messages are ignored
+            self._protocol_error(self.state.name)
 
 
 class RNSOutlet(LSOutletBase):
 
     def set_initiator_identified_callback(self, cb: Callable[[LSOutletBase, _TIdentity], None]):
-        def inner_cb(link, identity: _TIdentity):
-            cb(self, identity)
+        self._initiator_identified_cb = cb
+        self.link.set_remote_identified_callback(self._remote_identified)
 
-        self.link.set_remote_identified_callback(inner_cb)
+    def _remote_identified(self, link, identity: _TIdentity):
+        self._initiator_identified_cb(self, identity)
 
     def set_link_closed_callback(self, cb: Callable[[LSOutletBase], None]):
-        def inner_cb(link):
-            cb(self)
+        self._link_closed_cb = cb
+        self.link.set_link_closed_callback(self._link_closed)
 
-        self.link.set_link_closed_callback(inner_cb)
+    def _link_closed(self, link):
+        self._link_closed_cb(self)
 
     def unset_link_closed_callback(self):
         self.link.set_link_closed_callback(None)
@@ -412,6 +497,8 @@ class RNSOutlet(LSOutletBase):
 
     def __init__(self, link: RNS.Link):
         self.link = link
+        self._initiator_identified_cb: Callable[[LSOutletBase, _TIdentity], None] | None = None
+        self._link_closed_cb: Callable[[LSOutletBase], None] | None = None
         link.lsoutlet = self
 
     @staticmethod
@@ -0,0 +1,104 @@
+import random
+
+import rnsh.helpers
+import logging
+logging.getLogger().setLevel(logging.DEBUG)
+
+
+def test_chunk_buffer_extend_peek_consume():
+    buffer = rnsh.helpers.ChunkBuffer()
+    assert len(buffer) == 0
+    assert buffer.peek(10) == b""
+
+    buffer.extend(b"hello")
+    buffer.extend(b"world")
+    assert len(buffer) == 10
+    assert bytes(buffer.peek(3)) == b"hel"
+    assert bytes(buffer.peek(8)) == b"hellowor"
+    # peek must not consume
+    assert len(buffer) == 10
+
+    buffer.consume(8)
+    assert len(buffer) == 2
+    assert bytes(buffer.peek(10)) == b"ld"
+
+    buffer.consume(10)
+    assert len(buffer) == 0
+    assert buffer.peek(1) == b""
+
+
+def test_chunk_buffer_partial_consume_within_chunk():
+    buffer = rnsh.helpers.ChunkBuffer()
+    buffer.extend(b"abcdefgh")
+    buffer.consume(3)
+    assert len(buffer) == 5
+    assert bytes(buffer.peek(100)) == b"defgh"
+    buffer.extend(b"ij")
+    assert bytes(buffer.peek(100)) == b"defghij"
+    buffer.consume(7)
+    assert len(buffer) == 0
+
+
+def test_chunk_buffer_matches_bytearray_model():
+    random.seed(1234)
+    for _ in range(50):
+        buffer = rnsh.helpers.ChunkBuffer()
+        model = bytearray()
+        for _ in range(100):
+            op = random.random()
+            if op < 0.5:
+                data = bytes(random.choices(range(256), k=random.randint(0, 64)))
+                buffer.extend(data)
+                model.extend(data)
+            elif op < 0.8:
+                count = random.randint(0, 48)
+                assert bytes(buffer.peek(count)) == bytes(model[:count])
+            else:
+                count = random.randint(0, 64)
+                buffer.consume(count)
+                del model[:count]
+            assert len(buffer) == len(model)
+        assert bytes(buffer.peek(len(model) + 1)) == bytes(model)
+
+
+def test_buf_pool_get_put():
+    pool = rnsh.helpers.BufPool
+    pool._buffers.clear()
+
+    buf = pool.get(16)
+    assert isinstance(buf, bytearray)
+    assert len(buf) == 16
+
+    pool.put(buf)
+    assert len(pool._buffers) == 1
+    # recycled buffer is resized to the requested size
+    assert pool.get(4) is buf
+    assert len(buf) == 4
+    pool.put(buf)
+    assert pool.get(32) is buf
+    assert len(buf) == 32
+
+    # oversize buffers are not retained
+    pool.put(bytearray(pool.MAX_RECYCLE_LEN + 1))
+    assert len(pool._buffers) == 0
+
+    # pool is capped
+    for _ in range(pool.MAX_POOL_SIZE + 4):
+        pool.put(bytearray(8))
+    assert len(pool._buffers) == pool.MAX_POOL_SIZE
+    pool._buffers.clear()
+
+
+def test_chunk_buffer_recycles_coalesced_slabs():
+    pool = rnsh.helpers.BufPool
+    pool._buffers.clear()
+
+    buffer = rnsh.helpers.ChunkBuffer()
+    for index in range(8):
+        buffer.extend(bytes([index]) * 4)
+    # force a coalesce across several chunks, then drain it fully
+    assert bytes(buffer.peek(20)) == bytes().join(bytes([i]) * 4 for i in range(5))
+    buffer.consume(len(buffer))
+    assert len(buffer) == 0
+    assert len(pool._buffers) > 0
+    pool._buffers.clear()
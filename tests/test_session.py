@@ -0,0 +1,49 @@
+import logging
+
+import rnsh.process
+import rnsh.session
+logging.getLogger().setLevel(logging.DEBUG)
+
+
+class _FakeSubprocess:
+    def __init__(self, argv=None, env=None, loop=None, stdout_callback=None, stderr_callback=None,
+                 terminated_callback=None, stdin_is_pipe=False, stdout_is_pipe=False, stderr_is_pipe=False):
+        self.argv = argv
+
+    def start(self):
+        pass
+
+
+class _FakeLoop:
+    def create_task(self, coro):
+        coro.close()
+        return None
+
+
+def _make_session() -> rnsh.session.ListenerSession:
+    session = rnsh.session.ListenerSession.__new__(rnsh.session.ListenerSession)
+    session._log = logging.getLogger("test_session")
+    session.remote_identity = None
+    session.loop = _FakeLoop()
+    session.process = None
+    session._pump_task = None
+    session._data_ready = None
+    return session
+
+
+def test_start_cmd_does_not_mutate_default_command(monkeypatch):
+    monkeypatch.setattr(rnsh.process, "CallbackSubprocess", _FakeSubprocess)
+    monkeypatch.setattr(rnsh.session.ListenerSession, "default_command", ["/bin/sh"])
+    monkeypatch.setattr(rnsh.session.ListenerSession, "allow_remote_command", True)
+    monkeypatch.setattr(rnsh.session.ListenerSession, "remote_cmd_as_args", True)
+
+    one = _make_session()
+    one._start_cmd(["echo", "one"], False, False, False, None, None, None, None, None, None)
+    assert one.cmdline == ["/bin/sh", "echo", "one"]
+    assert rnsh.session.ListenerSession.default_command == ["/bin/sh"]
+
+    # a second session must not see the first session's arguments
+    two = _make_session()
+    two._start_cmd(["echo", "two"], False, False, False, None, None, None, None, None, None)
+    assert two.cmdline == ["/bin/sh", "echo", "two"]
+    assert rnsh.session.ListenerSession.default_command == ["/bin/sh"]